@@ -1,14 +1,42 @@
-from fastapi import FastAPI, HTTPException
+import time
+STARTED = time.perf_counter()
+
+import asyncio
+import hashlib
+import hmac
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import joblib
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 from detector import RuleBasedDetector
 from ml_model import MLDetector
 from utils import extract_features
+from coalescing import RequestCoalescer
+from duplicates import DuplicateDetector
+from diff_analysis import DiffAnalyzer, LRUCache, apply_unified_diff
+from responses import json_response, compact_smells, full_smells
+from findings import Findings, ML_SMELL, collect
+from profiling import RequestProfiler
+import server
+
+@asynccontextmanager
+async def lifespan(app):
+    # Started per worker, after any fork, so each process watches the artifacts
+    ml_detector.start_watcher(float(os.environ.get('MODEL_WATCH_INTERVAL', 10)))
+    if server.is_prefork_worker():
+        # Reloads requested through any worker are relayed to all of them
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(server.RELOAD_SIGNAL, lambda: loop.run_in_executor(None, ml_detector.reload))
+        # A replacement worker is forked with the parent's original model
+        await run_in_threadpool(ml_detector.reload)
+    yield
 
-app = FastAPI(title="Code Smell Detector API")
+app = FastAPI(title="Code Smell Detector API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -22,11 +50,22 @@ app.add_middleware(
 # Load ML model and detectors on startup
 ml_detector = MLDetector()
 rule_detector = RuleBasedDetector()
+# Opt-in, e.g. DUPLICATE_INDEX=duplicate_index.sqlite3
+duplicate_index = os.environ.get('DUPLICATE_INDEX', '')
+duplicate_detector = DuplicateDetector(duplicate_index) if duplicate_index else None
+diff_analyzer = DiffAnalyzer(rule_detector)
+file_cache = LRUCache(max_entries=1000)
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    capacity=int(os.environ.get('PROFILE_BUFFER', 50))
+)
+coalescer = RequestCoalescer(timeout=float(os.environ.get('ANALYZE_TIMEOUT', 30)))
 
 # Pydantic models for request/response
 class CodeInput(BaseModel):
     code: str
     language: str = "python"
+    source: Optional[str] = None  # file path; only code sent with one is added to the duplicate index
 
 class SmellResult(BaseModel):
     smell_type: str
@@ -41,84 +80,248 @@ class AnalysisResponse(BaseModel):
     metrics: Dict
     ml_prediction: Dict
 
+class CompactRule(BaseModel):
+    smell_type: str
+    suggestion: str
+    detector: str
+
+class CompactSmells(BaseModel):
+    format: str  # always "compact"
+    columns: List[str]
+    rules: Dict[str, CompactRule]  # keyed by rule id
+    descriptions: List[str]
+    rows: List[Tuple[str, str, int, int]]  # rule id, severity, line_number, description index
+
+class CompactAnalysisResponse(BaseModel):
+    smells: CompactSmells
+    metrics: Dict
+    ml_prediction: Dict
+
+class DiffInput(BaseModel):
+    old_code: str
+    new_code: Optional[str] = None
+    diff: Optional[str] = None  # unified diff against old_code
+    language: str = "python"
+
+class DiffAnalysisResponse(BaseModel):
+    smells: List[SmellResult]
+    changed_units: List[Dict]
+    metrics: Dict
+    ml_prediction: Dict
+    cache: Dict
+
 @app.get("/")
 async def root():
     return {
         "message": "Code Smell Detector API",
         "version": "1.0.0",
-        "endpoints": ["/analyze", "/health"]
+        "endpoints": ["/analyze", "/analyze/diff", "/health", "/monitoring"]
     }
 
 @app.get("/health")
 async def health_check():
     return {
-        "status": "healthy",
-        "ml_model_loaded": ml_detector.model is not None
+        "status": "healthy" if ml_detector.model is not None else "degraded",
+        "ml_model_loaded": ml_detector.model is not None,
+        "model_version": ml_detector.version,
+        "duplicate_index": duplicate_detector.stats() if duplicate_detector else None,
+        "coalescing": coalescer.stats(),
+        "process": server.worker_stats()
+    }
+
+def is_admin(request: Request) -> bool:
+    """True only when ADMIN_TOKEN is set and X-Admin-Token matches it"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('x-admin-token', ''), token)
+
+def require_admin(request: Request):
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/monitoring")
+async def monitoring():
+    """Feature drift against the training profile and ML inference latency"""
+    return ml_detector.monitor.report()
+
+@app.post("/monitoring/reset")
+async def reset_monitoring(request: Request):
+    require_admin(request)
+    ml_detector.monitor.reset()
+    return {"status": "reset"}
+
+@app.get("/debug/profiles")
+async def profiles(request: Request, sort: str = "tottime", limit: int = 30):
+    """Hot functions aggregated over recently profiled /analyze requests.
+    
+    Requests are profiled when they carry `X-Debug-Profile: 1` plus a
+    valid X-Admin-Token, or are sampled at PROFILE_SAMPLE_RATE. Both this
+    endpoint and the header are disabled unless ADMIN_TOKEN is set.
+    Under --workers N each worker keeps its own buffer; the report covers
+    only the worker named by `pid`.
+    """
+    require_admin(request)
+    return dict(profiler.report(sort=sort, limit=limit), pid=os.getpid())
+
+@app.post("/admin/reload-model")
+async def reload_model(request: Request, force: bool = False):
+    """Load, canary-check and swap in the model artifacts currently on disk.
+    
+    Requires ADMIN_TOKEN to be set and sent as X-Admin-Token. Under
+    --workers N the other workers are signalled to reload too; each
+    reports the version it serves in /health.
+    """
+    require_admin(request)
+    
+    # Loading runs in a worker thread; requests keep using the old model
+    result = await run_in_threadpool(ml_detector.reload, force)
+    if result['status'] in ('rejected', 'error'):
+        raise HTTPException(status_code=409, detail=result)
+    result['pid'] = os.getpid()
+    result['all_workers'] = server.broadcast_reload()
+    return result
+
+@app.post("/analyze", response_model=Union[AnalysisResponse, CompactAnalysisResponse])
+async def analyze_code(input: CodeInput, request: Request, format: str = "full"):
+    """Main endpoint to analyze code for smells.
+    
+    `format=compact` interns repeated rule text into lookup tables and
+    returns a CompactAnalysisResponse. The response is encoded directly
+    (no second pydantic validation) and compressed with zstd or gzip when
+    the client accepts it.
+    """
+    if format not in ("full", "compact"):
+        raise HTTPException(status_code=400, detail="format must be 'full' or 'compact'")
+    if not input.code.strip():
+        raise HTTPException(status_code=400, detail="Code cannot be empty")
+    
+    code_hash = hashlib.sha256(input.code.encode('utf-8')).hexdigest()
+    try:
+        if profiler.should_profile(request.headers, allow_header=is_admin(request)):
+            # Profiled requests skip coalescing so the profile reflects real work
+            result = await run_with_timeout(
+                profiler.run, run_analysis, input.code, input.source, input_hash=code_hash
+            )
+        else:
+            # Identical concurrent submissions share a single analysis
+            key = f"{code_hash}:{input.language}:{ml_detector.version}:{input.source}"
+            result = await coalescer.run(key, lambda: run_in_threadpool(run_analysis, input.code, input.source))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    result = dict(result, smells=serialize_smells(result['smells'], format))
+    return json_response(result, request.headers.get('accept-encoding'))
+
+async def run_with_timeout(func, *args, **kwargs):
+    """Run func in a thread, giving up on it after ANALYZE_TIMEOUT.
+    
+    As in the coalesced path the thread itself cannot be stopped; the
+    shielded task keeps running and its outcome is discarded.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return await asyncio.wait_for(asyncio.shield(task), coalescer.timeout)
+
+def run_analysis(code: str, source: Optional[str] = None) -> Dict:
+    """Run the full detector pipeline on a piece of code"""
+    # Run rule-based detection
+    rule_smells = rule_detector.detect_all(code)
+    
+    # Check for near-duplicates of previously analyzed functions
+    if duplicate_detector is not None:
+        rule_smells.extend(duplicate_detector.detect(code, source))
+    
+    # Run ML-based detection
+    ml_result = ml_detector.predict(code)
+    
+    # Calculate metrics
+    metrics = calculate_code_metrics(code)
+    
+    return {
+        "smells": build_smell_results(rule_smells, ml_result),
+        "metrics": metrics,
+        "ml_prediction": ml_result
     }
 
-@app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_code(input: CodeInput):
-    """Main endpoint to analyze code for smells"""
+@app.post("/analyze/diff", response_model=DiffAnalysisResponse)
+async def analyze_diff(input: DiffInput, request: Request):
+    """Analyze only the functions and classes touched by a change"""
+    if (input.new_code is None) == (input.diff is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of new_code or diff")
+    
+    new_code = input.new_code
+    if new_code is None:
+        try:
+            new_code = apply_unified_diff(input.old_code, input.diff)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid diff: {e}")
+    
     try:
-        if not input.code.strip():
-            raise HTTPException(status_code=400, detail="Code cannot be empty")
-        
-        # Run rule-based detection
-        rule_smells = rule_detector.detect_all(input.code)
-        
-        # Run ML-based detection
-        ml_result = ml_detector.predict(input.code)
-        
-        # Combine results
-        all_smells = []
-        
-        # Add rule-based smells
-        for smell in rule_smells:
-            all_smells.append(SmellResult(
-                smell_type=smell['type'],
-                severity=smell['severity'],
-                line_number=smell['line'],
-                description=smell['description'],
-                suggestion=smell['suggestion'],
-                detector="rule-based"
-            ))
-        
-        # Add ML prediction as a smell if detected
-        if ml_result['has_smell']:
-            all_smells.append(SmellResult(
-                smell_type="ML Detected Smell",
-                severity="medium",
-                line_number=1,
-                description=f"ML model detected potential code smell with {ml_result['confidence']:.1%} confidence",
-                suggestion="Review the code structure and consider refactoring based on rule-based suggestions",
-                detector="ml"
-            ))
-        
-        # Calculate metrics
-        metrics = calculate_code_metrics(input.code)
-        
-        # Remove duplicates by (type, line)
-        unique_smells = {}
-        for smell in all_smells:
-            key = (smell.smell_type, smell.line_number)
-            if key not in unique_smells:
-                unique_smells[key] = smell
-        
-        # Sort by severity
-        severity_order = {"high": 0, "medium": 1, "low": 2}
-        sorted_smells = sorted(
-            unique_smells.values(),
-            key=lambda x: severity_order.get(x.severity, 3)
-        )
-        
-        return AnalysisResponse(
-            smells=sorted_smells,
-            metrics=metrics,
-            ml_prediction=ml_result
-        )
-        
+        result = await run_in_threadpool(run_diff_analysis, input.old_code, new_code)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    result = dict(result, smells=serialize_smells(result['smells']))
+    return json_response(result, request.headers.get('accept-encoding'))
+
+def file_summary(code: str):
+    """Whole-file metrics and smell probability, cached by content hash and model version.
+    
+    Scoring bypasses predict() so diff inputs (old_code in particular) do
+    not feed the /monitoring drift and latency stats.
+    """
+    key = (hashlib.sha256(code.encode('utf-8')).digest(), ml_detector.version)
+    summary = file_cache.get(key)
+    if summary is None:
+        summary = (calculate_code_metrics(code), ml_detector.smell_probability(code))
+        file_cache.put(key, summary)
+    return summary
+
+def run_diff_analysis(old_code: str, new_code: str) -> Dict:
+    result = diff_analyzer.analyze(old_code, new_code)
+    old_metrics, old_score = file_summary(old_code)
+    new_metrics, new_score = file_summary(new_code)
+    
+    metric_delta = {
+        name: round(value - old_metrics.get(name, 0), 3)
+        for name, value in new_metrics.items()
+        if isinstance(value, (int, float))
+    }
+    old_score = old_score or 0.0
+    new_score = new_score or 0.0
+    
+    return {
+        "smells": build_smell_results(result['smells']),
+        "changed_units": result['changed_units'],
+        "metrics": {"old": old_metrics, "new": new_metrics, "delta": metric_delta},
+        "ml_prediction": {
+            "old_smell_probability": old_score,
+            "new_smell_probability": new_score,
+            "delta": round(new_score - old_score, 4),
+            "has_smell": new_score > 0.5
+        },
+        "cache": {
+            "changed_lines": result['changed_lines'],
+            "units_analyzed": len(result['changed_units']),
+            "units_total": result['total_units'],
+            "unit_cache": diff_analyzer.cache.stats()
+        }
+    }
+
+def build_smell_results(rule_smells, ml_result=None) -> Findings:
+    """Combine rule and ML findings, dedupe by (type, line) and sort by severity"""
+    ml_smells = Findings()
+    if ml_result and ml_result['has_smell']:
+        ml_smells.add(ML_SMELL, "medium", 1, ml_result['confidence'])
+    return collect(rule_smells, ml_smells)
+
+def serialize_smells(smells: Findings, format: str = "full"):
+    """Render findings as SmellResult-shaped dicts or the compact table format"""
+    if format == "compact":
+        return compact_smells(smells)
+    return full_smells(smells)
 
 def calculate_code_metrics(code: str) -> Dict:
     """Calculate various code metrics"""
@@ -152,8 +355,24 @@ def calculate_code_metrics(code: str) -> Dict:
     }
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Code Smell Detector API")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Fork this many workers sharing the preloaded model (default: 1)")
+    args = parser.parse_args()
+    
     print("🚀 Starting Code Smell Detector API...")
-    print("📍 API will be available at: http://localhost:8000")
-    print("📚 API docs at: http://localhost:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    print(f"⏱️  Model and detectors loaded in {time.perf_counter() - STARTED:.2f}s")
+    print(f"📍 API will be available at: http://localhost:{args.port}")
+    print(f"📚 API docs at: http://localhost:{args.port}/docs")
+    if args.workers > 1:
+        server.serve(app, host=args.host, port=args.port, workers=args.workers)
+    else:
+        # As for pre-fork workers: collections triggered by request garbage
+        # no longer rescan the model and modules loaded at startup
+        server.freeze_shared_state()
+        uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
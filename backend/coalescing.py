@@ -0,0 +1,53 @@
+import asyncio
+
+class RequestCoalescer:
+    """Share one in-flight computation between concurrent identical requests"""
+    
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.in_flight = {}
+        self.computed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+    
+    async def run(self, key, factory):
+        """Await the result for `key`, starting `factory()` only if nothing is in flight.
+        
+        The shared task is shielded, so a waiter that times out or is
+        cancelled (client disconnect) does not abort it for the others.
+        Exceptions raised by the computation propagate to every waiter.
+        """
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.computed += 1
+        else:
+            self.coalesced += 1
+        
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+    
+    def _finish(self, key, task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Retrieve the exception so it is not reported as unhandled when
+        # every waiter has already timed out
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+    
+    def stats(self):
+        total = self.computed + self.coalesced
+        return {
+            'computed': self.computed,
+            'coalesced': self.coalesced,
+            'coalesced_ratio': round(self.coalesced / total, 4) if total else 0.0,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'in_flight': len(self.in_flight)
+        }
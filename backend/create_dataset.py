@@ -1,8 +1,30 @@
-import pandas as pd
+import ast
+import builtins
+import csv
+import os
 import random
+import re
+import pandas as pd
 
-def generate_training_data():
-    """Generate synthetic code smell dataset with more diversity"""
+# Word substitutions used to vary identifiers between samples
+WORD_VARIATIONS = {
+    'user': ['customer', 'account', 'person', 'member', 'client'],
+    'order': ['purchase', 'transaction', 'sale', 'booking'],
+    'data': ['info', 'details', 'record', 'entity'],
+    'email': ['mail', 'message', 'notification'],
+    'process': ['handle', 'execute', 'perform'],
+    'calculate': ['compute', 'determine', 'evaluate'],
+    'validate': ['verify', 'check', 'confirm'],
+}
+
+# Extra vocabulary for generated identifiers and filler statements
+VERBS = ['load', 'save', 'update', 'sync', 'refresh', 'notify', 'record', 'audit',
+         'export', 'merge', 'resolve', 'prepare', 'dispatch', 'normalize', 'apply']
+NOUNS = ['cache', 'report', 'session', 'invoice', 'profile', 'ledger', 'payload',
+         'config', 'metrics', 'queue', 'account', 'batch', 'token', 'record', 'event']
+
+def build_base_samples():
+    """Return the hand-written template samples used as generator seeds"""
     
     samples = []
     
@@ -307,30 +329,26 @@ def generate_training_data():
             'severity': 'none'
         })
     
+    return samples
+
+def generate_training_data():
+    """Generate synthetic code smell dataset with more diversity"""
+    
+    samples = build_base_samples()
+    
     # Create variations with noise
     expanded_samples = []
     
     # Base samples
     expanded_samples.extend(samples)
     
-    # Create variations with substitutions
-    word_variations = {
-        'user': ['customer', 'account', 'person', 'member', 'client'],
-        'order': ['purchase', 'transaction', 'sale', 'booking'],
-        'data': ['info', 'details', 'record', 'entity'],
-        'email': ['mail', 'message', 'notification'],
-        'process': ['handle', 'execute', 'perform'],
-        'calculate': ['compute', 'determine', 'evaluate'],
-        'validate': ['verify', 'check', 'confirm'],
-    }
-    
     # Generate 12 variations of each sample
     for _ in range(12):
         for sample in samples:
             code_var = sample['code']
             
             # Apply random word substitutions
-            for original, replacements in word_variations.items():
+            for original, replacements in WORD_VARIATIONS.items():
                 if original in code_var.lower():
                     replacement = random.choice(replacements)
                     code_var = code_var.replace(original, replacement)
@@ -354,9 +372,239 @@ def generate_training_data():
     df = pd.DataFrame(expanded_samples)
     return df
 
+# ---------------------------------------------------------------------------
+# Streaming generator
+#
+# The functions below mutate the base templates at the AST level instead of
+# doing text substitution, so a single process can yield an unbounded number
+# of distinct, still-parseable samples. Rows are written straight to sharded
+# CSV files; nothing is accumulated in memory.
+# ---------------------------------------------------------------------------
+
+COLUMNS = ['code', 'smell_type', 'has_smell', 'severity']
+_RESERVED = set(dir(builtins)) | {'self', 'cls'}
+
+class IdentifierRenamer(ast.NodeTransformer):
+    """Consistently rename user-defined identifiers in a parsed sample"""
+    
+    def __init__(self, rng):
+        self.rng = rng
+        self.mapping = {}
+    
+    def new_name(self, name):
+        if name in _RESERVED or name.startswith('__'):
+            return name
+        if name not in self.mapping:
+            camel = name[:1].isupper()
+            parts = re.findall(r'[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])', name) if camel else name.split('_')
+            renamed = []
+            for part in parts:
+                options = WORD_VARIATIONS.get(part.lower())
+                if options and self.rng.random() < 0.7:
+                    part = self.rng.choice(options)
+                elif part and self.rng.random() < 0.15:
+                    part = self.rng.choice(NOUNS)
+                renamed.append(part)
+            if camel:
+                new = ''.join(p[:1].upper() + p[1:] for p in renamed)
+            else:
+                new = '_'.join(renamed)
+            self.mapping[name] = new or name
+        return self.mapping[name]
+    
+    def visit_FunctionDef(self, node):
+        node.name = self.new_name(node.name)
+        self.generic_visit(node)
+        return node
+    
+    def visit_ClassDef(self, node):
+        node.name = self.new_name(node.name)
+        self.generic_visit(node)
+        return node
+    
+    def visit_arg(self, node):
+        node.arg = self.new_name(node.arg)
+        return node
+    
+    def visit_Name(self, node):
+        node.id = self.new_name(node.id)
+        return node
+    
+    def visit_Attribute(self, node):
+        self.generic_visit(node)
+        node.attr = self.new_name(node.attr)
+        return node
+
+def _filler_statement(rng, names):
+    """Build a plausible one-line call statement"""
+    func = f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}"
+    args = rng.sample(names, min(len(names), rng.randint(0, 2))) if names else []
+    return ast.parse(f"{func}({', '.join(args)})").body[0]
+
+def _functions(tree):
+    return [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
+
+def scale_length(tree, rng, extra):
+    """Insert `extra` filler statements before the final statement of each function"""
+    for func in _functions(tree):
+        names = [a.arg for a in func.args.args if a.arg != 'self']
+        for _ in range(extra):
+            pos = rng.randint(0, max(len(func.body) - 1, 0))
+            func.body.insert(pos, _filler_statement(rng, names))
+    return tree
+
+def deepen_nesting(tree, rng, levels):
+    """Wrap the innermost block of each function in `levels` extra conditionals"""
+    for func in _functions(tree):
+        block = func
+        while True:
+            nested = [s for s in block.body if isinstance(s, (ast.If, ast.For, ast.While, ast.With))]
+            if not nested:
+                break
+            block = nested[-1]
+        for _ in range(levels):
+            cond = ast.parse(f"{rng.choice(NOUNS)}.is_{rng.choice(['valid', 'ready', 'active', 'enabled'])}", mode='eval').body
+            block.body = [ast.If(test=cond, body=block.body, orelse=[])]
+            block = block.body[0]
+    return tree
+
+def widen_parameters(tree, rng, extra):
+    """Append `extra` parameters to every function signature"""
+    for func in _functions(tree):
+        existing = {a.arg for a in func.args.args}
+        for _ in range(extra):
+            name = f"{rng.choice(NOUNS)}_{rng.choice(['id', 'name', 'flag', 'limit', 'mode'])}"
+            if name not in existing:
+                existing.add(name)
+                func.args.args.append(ast.arg(arg=name))
+    return tree
+
+def add_methods(tree, rng, extra):
+    """Add `extra` trivial methods to every class"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            existing = {n.name for n in node.body if isinstance(n, ast.FunctionDef)}
+            for _ in range(extra):
+                name = f"{rng.choice(VERBS)}_{rng.choice(NOUNS)}"
+                if name not in existing:
+                    existing.add(name)
+                    node.body.append(ast.parse(f"def {name}(self): pass").body[0])
+    return tree
+
+# Mutations that strengthen (never weaken) each smell, keyed by smell type
+SMELL_MUTATIONS = {
+    'long_method': lambda tree, rng: scale_length(tree, rng, rng.randint(0, 30)),
+    'deep_nesting': lambda tree, rng: deepen_nesting(tree, rng, rng.randint(0, 3)),
+    'too_many_parameters': lambda tree, rng: widen_parameters(tree, rng, rng.randint(0, 4)),
+    'god_class': lambda tree, rng: add_methods(tree, rng, rng.randint(0, 12)),
+}
+
+def mutate_sample(sample, rng):
+    """Return a new sample derived from `sample` with label-preserving mutations"""
+    tree = ast.parse(sample['code'])
+    mutation = SMELL_MUTATIONS.get(sample['smell_type'])
+    if mutation:
+        tree = mutation(tree, rng)
+    tree = IdentifierRenamer(rng).visit(tree)
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+def iter_samples(rng, base_samples=None, noise=0.05, max_companions=3):
+    """Yield an endless stream of mutated samples as CSV-ready dicts.
+    
+    Each sample may be combined with up to `max_companions` mutated clean
+    samples in the same module, which scales file length without changing
+    the label. A `noise` fraction of labels is flipped.
+    """
+    base = base_samples or build_base_samples()
+    clean = [s for s in base if s['smell_type'] == 'none']
+    
+    while True:
+        sample = rng.choice(base)
+        parts = [mutate_sample(sample, rng)]
+        for _ in range(rng.randint(0, max_companions)):
+            parts.append(mutate_sample(rng.choice(clean), rng))
+        rng.shuffle(parts)
+        
+        has_smell = sample['has_smell']
+        if sample['smell_type'] == 'borderline':
+            has_smell = rng.choice([0, 1])
+        if rng.random() < noise:
+            has_smell = 1 - has_smell
+        
+        yield {
+            'code': '\n\n'.join(parts),
+            'smell_type': sample['smell_type'],
+            'has_smell': has_smell,
+            'severity': sample['severity']
+        }
+
+def shard_path(out_dir, shard):
+    return os.path.join(out_dir, f"code_samples-{shard:05d}.csv")
+
+def write_shard(job):
+    """Write one shard of `rows` samples; safe to run in a worker process"""
+    out_dir, shard, rows, seed = job
+    rng = random.Random(seed * 1_000_003 + shard)
+    base = build_base_samples()
+    path = shard_path(out_dir, shard)
+    smelly = 0
+    
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        stream = iter_samples(rng, base)
+        for _ in range(rows):
+            row = next(stream)
+            smelly += row['has_smell']
+            writer.writerow(row)
+    
+    return path, rows, smelly
+
+def generate_sharded_dataset(out_dir, total_rows, num_shards=8, seed=42, workers=None):
+    """Stream `total_rows` samples into `num_shards` CSV files under `out_dir`.
+    
+    Output depends only on (total_rows, num_shards, seed), not on the number
+    of worker processes. Returns the list of shard paths.
+    """
+    from multiprocessing import Pool
+    
+    os.makedirs(out_dir, exist_ok=True)
+    per_shard, remainder = divmod(total_rows, num_shards)
+    jobs = [
+        (out_dir, shard, per_shard + (1 if shard < remainder else 0), seed)
+        for shard in range(num_shards)
+    ]
+    
+    paths = []
+    written = 0
+    smelly = 0
+    with Pool(workers or os.cpu_count()) as pool:
+        for path, rows, shard_smelly in pool.imap_unordered(write_shard, jobs):
+            paths.append(path)
+            written += rows
+            smelly += shard_smelly
+            print(f"   {path}: {rows} rows ({written}/{total_rows})")
+    
+    print(f"\n🎯 Has Smell: {smelly} ({smelly / max(written, 1) * 100:.1f}%)")
+    return sorted(paths)
+
 # Generate and save dataset
 if __name__ == "__main__":
-    import os
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate the code smell training dataset")
+    parser.add_argument('--rows', type=int, help="Stream this many mutated samples to sharded CSV files")
+    parser.add_argument('--shards', type=int, default=8, help="Number of output shards (default: 8)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument('--out', default='data/shards', help="Output directory for shards")
+    args = parser.parse_args()
+    
+    if args.rows:
+        print(f"🔄 Streaming {args.rows} samples into {args.shards} shards...")
+        paths = generate_sharded_dataset(args.out, args.rows, args.shards, args.seed, args.workers)
+        print(f"\n💾 Saved {len(paths)} shards to: {args.out}")
+        raise SystemExit(0)
     
     if not os.path.exists('data'):
         os.makedirs('data')
@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from utils import extract_features, FEATURE_NAMES
+
+# On-disk layout of a store directory:
+#   meta.json         row/blob counts, column dtypes and category tables
+#   blobs.bin         zlib-compressed code blobs, deduplicated by SHA-1
+#   blob_ends.i8      end offset of each blob in blobs.bin
+#   blob_hashes.bin   20-byte SHA-1 digest of each blob (for deduplication)
+#   <column>.col      one raw little-endian array per column, one value per row
+
+LABEL_COLUMNS = {'has_smell': '<i1', 'blob': '<i8', 'smell_type': '<i2', 'severity': '<i2'}
+FEATURE_DTYPE = '<f8'
+CATEGORICAL = ('smell_type', 'severity')
+
+def _extract(code):
+    features = extract_features(code)
+    if features is None:
+        return None
+    return [float(features[name]) for name in FEATURE_NAMES]
+
+class DatasetWriter:
+    """Append samples to a dataset store, extracting features once per unique blob"""
+    
+    def __init__(self, path, workers=None, batch_size=2000, level=6):
+        self.path = path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.level = level
+        os.makedirs(path, exist_ok=True)
+        
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            columns = {name: FEATURE_DTYPE for name in FEATURE_NAMES}
+            columns.update(LABEL_COLUMNS)
+            self.meta = {
+                'rows': 0,
+                'blobs': 0,
+                'columns': columns,
+                'categories': {name: [] for name in CATEGORICAL},
+                'skipped': 0
+            }
+        
+        self._truncate_to_meta()
+        
+        # SHA-1 digest -> blob id for blobs already in the store
+        self.blob_ids = {}
+        hashes_path = os.path.join(path, 'blob_hashes.bin')
+        if os.path.exists(hashes_path):
+            with open(hashes_path, 'rb') as f:
+                digests = f.read()
+            for blob_id in range(len(digests) // 20):
+                self.blob_ids[digests[blob_id * 20:(blob_id + 1) * 20]] = blob_id
+        self.first_rows = None
+        
+        self.blobs = open(os.path.join(path, 'blobs.bin'), 'ab')
+        self.blob_ends = open(os.path.join(path, 'blob_ends.i8'), 'ab')
+        self.blob_hashes = open(hashes_path, 'ab')
+        self.columns = {
+            name: open(os.path.join(path, f'{name}.col'), 'ab')
+            for name in self.meta['columns']
+        }
+        self.pending = []
+        self.pool = None
+    
+    def _truncate_to_meta(self):
+        """Drop bytes written after the last meta.json update.
+        
+        flush() appends to the data files before rewriting meta.json, so a
+        crash in between leaves orphaned values that would shift every
+        later row of one column against the others.
+        """
+        blobs = self.meta['blobs']
+        ends_path = os.path.join(self.path, 'blob_ends.i8')
+        blob_end = 0
+        if blobs:
+            blob_end = int(np.fromfile(ends_path, dtype='<i8', count=blobs)[-1])
+        sizes = {
+            'blobs.bin': blob_end,
+            'blob_ends.i8': blobs * 8,
+            'blob_hashes.bin': blobs * 20,
+        }
+        for name, dtype in self.meta['columns'].items():
+            sizes[f'{name}.col'] = self.meta['rows'] * np.dtype(dtype).itemsize
+        
+        for filename, size in sizes.items():
+            file_path = os.path.join(self.path, filename)
+            actual = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            if actual < size:
+                raise ValueError(f"{file_path} has {actual} bytes, meta.json expects {size}")
+            if actual > size:
+                os.truncate(file_path, size)
+    
+    def _category(self, column, value):
+        table = self.meta['categories'][column]
+        value = str(value)
+        if value not in table:
+            table.append(value)
+        return table.index(value)
+    
+    def _load_first_rows(self):
+        """Map each existing blob id to its first row (-1 if it has none)"""
+        self.first_rows = np.full(self.meta['blobs'], -1, dtype=np.int64)
+        if self.meta['rows'] == 0:
+            return
+        blobs = np.asarray(DatasetStore(self.path).column('blob'))
+        blob_ids, rows = np.unique(blobs, return_index=True)
+        self.first_rows[blob_ids] = rows
+    
+    def _stored_features(self, blob_ids):
+        """Read features of already-written blobs back from the column files"""
+        blob_ids = sorted(b for b in set(blob_ids) if b < len(self.first_rows) and self.first_rows[b] >= 0)
+        if not blob_ids:
+            return {}
+        store = DatasetStore(self.path)
+        rows = self.first_rows[blob_ids]
+        matrix = np.column_stack([store.column(name)[rows] for name in FEATURE_NAMES])
+        return dict(zip(blob_ids, matrix.tolist()))
+    
+    def add(self, code, smell_type, has_smell, severity):
+        """Queue one sample; it is written when the current batch is flushed"""
+        self.pending.append((code, smell_type, int(has_smell), severity))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if not self.pending:
+            return
+        if self.first_rows is None:
+            self._load_first_rows()
+        
+        # Deduplicate within the batch and against the store
+        new_blobs = []
+        row_blobs = []
+        for code, _, _, _ in self.pending:
+            digest = hashlib.sha1(code.encode('utf-8')).digest()
+            blob_id = self.blob_ids.get(digest)
+            if blob_id is None:
+                blob_id = self.meta['blobs'] + len(new_blobs)
+                self.blob_ids[digest] = blob_id
+                new_blobs.append((digest, code))
+            row_blobs.append(blob_id)
+        
+        # Extract features for new blobs only
+        codes = [code for _, code in new_blobs]
+        if self.workers and self.workers > 1 and len(codes) > 1:
+            if self.pool is None:
+                from multiprocessing import Pool
+                self.pool = Pool(self.workers)
+            extracted = self.pool.map(_extract, codes, chunksize=64)
+        else:
+            extracted = [_extract(code) for code in codes]
+        
+        # Duplicates of earlier batches reuse the features of their first row
+        batch_features = self._stored_features(row_blobs)
+        self.first_rows = np.concatenate([self.first_rows, np.full(len(new_blobs), -1, dtype=np.int64)])
+        
+        end = self.blobs.tell()
+        for (digest, code), features in zip(new_blobs, extracted):
+            data = zlib.compress(code.encode('utf-8'), self.level)
+            self.blobs.write(data)
+            end += len(data)
+            np.array([end], dtype='<i8').tofile(self.blob_ends)
+            self.blob_hashes.write(digest)
+            batch_features[self.meta['blobs']] = features
+            self.meta['blobs'] += 1
+        
+        # Append one value per column for each row with usable features
+        values = {name: [] for name in self.meta['columns']}
+        for (code, smell_type, has_smell, severity), blob_id in zip(self.pending, row_blobs):
+            features = batch_features.get(blob_id)
+            if features is None:
+                self.meta['skipped'] += 1
+                continue
+            if self.first_rows[blob_id] < 0:
+                self.first_rows[blob_id] = self.meta['rows']
+            for name, value in zip(FEATURE_NAMES, features):
+                values[name].append(value)
+            values['has_smell'].append(has_smell)
+            values['blob'].append(blob_id)
+            values['smell_type'].append(self._category('smell_type', smell_type))
+            values['severity'].append(self._category('severity', severity))
+            self.meta['rows'] += 1
+        
+        for name, column in values.items():
+            np.array(column, dtype=self.meta['columns'][name]).tofile(self.columns[name])
+        
+        self.pending = []
+        self._write_meta()
+    
+    def _write_meta(self):
+        for f in [self.blobs, self.blob_ends, self.blob_hashes, *self.columns.values()]:
+            f.flush()
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+    
+    def close(self):
+        self.flush()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        for f in [self.blobs, self.blob_ends, self.blob_hashes, *self.columns.values()]:
+            f.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class DatasetStore:
+    """Read-only, memory-mapped view over a dataset store directory"""
+    
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._columns = {}
+        self._blobs = None
+        self._blob_ends = None
+    
+    def __len__(self):
+        return self.meta['rows']
+    
+    def _memmap(self, filename, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode='r', shape=(length,))
+    
+    def column(self, name):
+        """Return a memory-mapped array with one value per row"""
+        if name not in self._columns:
+            self._columns[name] = self._memmap(f'{name}.col', self.meta['columns'][name], len(self))
+        return self._columns[name]
+    
+    def code(self, row):
+        """Decompress the source code of a single row"""
+        if self._blobs is None:
+            self._blob_ends = self._memmap('blob_ends.i8', '<i8', self.meta['blobs'])
+            size = int(self._blob_ends[-1]) if len(self._blob_ends) else 0
+            self._blobs = self._memmap('blobs.bin', 'u1', size)
+        blob_id = int(self.column('blob')[row])
+        start = int(self._blob_ends[blob_id - 1]) if blob_id > 0 else 0
+        end = int(self._blob_ends[blob_id])
+        return zlib.decompress(self._blobs[start:end].tobytes()).decode('utf-8')
+    
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        categories = self.meta['categories']
+        return {
+            'code': self.code(row),
+            'smell_type': categories['smell_type'][int(self.column('smell_type')[row])],
+            'has_smell': int(self.column('has_smell')[row]),
+            'severity': categories['severity'][int(self.column('severity')[row])],
+            'features': {name: float(self.column(name)[row]) for name in FEATURE_NAMES}
+        }
+    
+    def features(self, start=0, stop=None):
+        """Feature matrix for rows [start, stop) as a DataFrame"""
+        return pd.DataFrame({name: np.asarray(self.column(name)[start:stop]) for name in FEATURE_NAMES})
+    
+    def labels(self, start=0, stop=None):
+        return np.asarray(self.column('has_smell')[start:stop]).astype(int)
+    
+    def iter_chunks(self, chunk_size=50000):
+        """Yield (X, y) pairs of at most `chunk_size` rows"""
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            yield self.features(start, stop), self.labels(start, stop)
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+def build_store(out_dir, csv_paths, workers=None, chunksize=20000):
+    """Append every row of the given CSV files to the store at `out_dir`"""
+    with DatasetWriter(out_dir, workers=workers) as writer:
+        for csv_path in csv_paths:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                for row in chunk.itertuples(index=False):
+                    writer.add(row.code, row.smell_type, row.has_smell, row.severity)
+            writer.flush()
+            print(f"   {csv_path}: {writer.meta['rows']} rows, {writer.meta['blobs']} unique blobs")
+    return DatasetStore(out_dir)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build or inspect a columnar dataset store")
+    parser.add_argument('csv', nargs='*', help="CSV files to append (code, smell_type, has_smell, severity)")
+    parser.add_argument('--out', default='data/store', help="Store directory (default: data/store)")
+    parser.add_argument('--workers', type=int, help="Processes used for feature extraction")
+    args = parser.parse_args()
+    
+    if args.csv:
+        print(f"🔄 Building dataset store in {args.out}...")
+        store = build_store(args.out, args.csv, workers=args.workers)
+    else:
+        store = DatasetStore(args.out)
+    
+    size = sum(os.path.getsize(os.path.join(args.out, f)) for f in os.listdir(args.out))
+    print(f"\n✅ {len(store)} rows, {store.meta['blobs']} unique blobs, {store.meta['skipped']} skipped")
+    print(f"💾 {size / 1024 / 1024:.1f} MB on disk")
@@ -1,12 +1,19 @@
 import ast
 import re
+from findings import (
+    Findings, LONG_METHOD, TOO_MANY_PARAMETERS, DEEP_NESTING, GOD_CLASS, MAGIC_NUMBER
+)
+
+def count_methods(node):
+    """Number of plain `def` methods directly in a ClassDef body"""
+    return sum(isinstance(n, ast.FunctionDef) for n in node.body)
 
 class RuleBasedDetector:
     """Rule-based code smell detection"""
     
     def detect_all(self, code):
         """Run all detection rules"""
-        smells = []
+        smells = Findings()
         smells.extend(self.detect_long_method(code))
         smells.extend(self.detect_too_many_parameters(code))
         smells.extend(self.detect_deep_nesting(code))
@@ -16,7 +23,7 @@ class RuleBasedDetector:
     
     def detect_long_method(self, code):
         """Detect methods longer than threshold"""
-        smells = []
+        smells = Findings()
         lines = code.split('\n')
         current_function = None
         function_start = 0
@@ -28,13 +35,12 @@ class RuleBasedDetector:
             if trimmed.startswith('def '):
                 # Check previous function
                 if current_function and (idx - function_start) > 25:
-                    smells.append({
-                        'type': 'Long Method',
-                        'severity': 'high' if (idx - function_start) > 40 else 'medium',
-                        'line': function_start + 1,
-                        'description': f"Method '{current_function}' has {idx - function_start} lines. Methods should be under 25 lines.",
-                        'suggestion': 'Break this method into smaller, focused functions. Each function should do one thing well.'
-                    })
+                    smells.add(
+                        LONG_METHOD,
+                        'high' if (idx - function_start) > 40 else 'medium',
+                        function_start + 1,
+                        (current_function, idx - function_start)
+                    )
                 
                 # Start tracking new function
                 match = re.match(r'def\s+(\w+)', trimmed)
@@ -44,19 +50,18 @@ class RuleBasedDetector:
         
         # Check last function
         if current_function and (len(lines) - function_start) > 25:
-            smells.append({
-                'type': 'Long Method',
-                'severity': 'high' if (len(lines) - function_start) > 40 else 'medium',
-                'line': function_start + 1,
-                'description': f"Method '{current_function}' has {len(lines) - function_start} lines. Methods should be under 25 lines.",
-                'suggestion': 'Break this method into smaller, focused functions. Each function should do one thing well.'
-            })
+            smells.add(
+                LONG_METHOD,
+                'high' if (len(lines) - function_start) > 40 else 'medium',
+                function_start + 1,
+                (current_function, len(lines) - function_start)
+            )
         
         return smells
     
     def detect_too_many_parameters(self, code):
         """Detect functions with too many parameters"""
-        smells = []
+        smells = Findings()
         lines = code.split('\n')
         
         for idx, line in enumerate(lines):
@@ -67,19 +72,18 @@ class RuleBasedDetector:
                 params = [p.strip() for p in params_str.split(',') if p.strip() and p.strip() != 'self']
                 
                 if len(params) > 5:
-                    smells.append({
-                        'type': 'Too Many Parameters',
-                        'severity': 'high' if len(params) > 7 else 'medium',
-                        'line': idx + 1,
-                        'description': f"Function '{func_name}' has {len(params)} parameters. Keep it under 5 for better readability.",
-                        'suggestion': 'Consider grouping related parameters into a configuration object or dataclass.'
-                    })
+                    smells.add(
+                        TOO_MANY_PARAMETERS,
+                        'high' if len(params) > 7 else 'medium',
+                        idx + 1,
+                        (func_name, len(params))
+                    )
         
         return smells
     
     def detect_deep_nesting(self, code):
         """Detect deeply nested code blocks"""
-        smells = []
+        smells = Findings()
         lines = code.split('\n')
         
         for idx, line in enumerate(lines):
@@ -91,44 +95,45 @@ class RuleBasedDetector:
             nesting_level = indent // 4
             
             if nesting_level >= 4:
-                smells.append({
-                    'type': 'Deep Nesting',
-                    'severity': 'high' if nesting_level >= 5 else 'medium',
-                    'line': idx + 1,
-                    'description': f"Code has {nesting_level} levels of nesting. This makes it hard to understand and test.",
-                    'suggestion': 'Use early returns, extract methods, or use guard clauses to reduce nesting.'
-                })
+                smells.add(
+                    DEEP_NESTING,
+                    'high' if nesting_level >= 5 else 'medium',
+                    idx + 1,
+                    nesting_level
+                )
         
         return smells
     
     def detect_god_class(self, code):
         """Detect classes with too many methods"""
-        smells = []
+        smells = Findings()
         
         try:
             tree = ast.parse(code)
             
             for node in ast.walk(tree):
                 if isinstance(node, ast.ClassDef):
-                    methods = [n for n in node.body if isinstance(n, ast.FunctionDef)]
-                    num_methods = len(methods)
-                    
-                    if num_methods > 10:
-                        smells.append({
-                            'type': 'God Class',
-                            'severity': 'high' if num_methods > 15 else 'medium',
-                            'line': node.lineno,
-                            'description': f"Class '{node.name}' has {num_methods} methods. It likely has too many responsibilities.",
-                            'suggestion': 'Apply Single Responsibility Principle. Split this class into smaller, focused classes.'
-                        })
+                    smells.extend(self.check_god_class(node.name, node.lineno, count_methods(node)))
         except:
             pass
         
         return smells
     
+    def check_god_class(self, name, line, num_methods):
+        """God Class finding for a class whose methods are already counted"""
+        smells = Findings()
+        if num_methods > 10:
+            smells.add(
+                GOD_CLASS,
+                'high' if num_methods > 15 else 'medium',
+                line,
+                (name, num_methods)
+            )
+        return smells
+    
     def detect_magic_numbers(self, code):
         """Detect magic numbers in code"""
-        smells = []
+        smells = Findings()
         lines = code.split('\n')
         
         for idx, line in enumerate(lines):
@@ -144,12 +149,6 @@ class RuleBasedDetector:
                 if number in ['100', '1000', '0']:
                     continue
                 
-                smells.append({
-                    'type': 'Magic Number',
-                    'severity': 'low',
-                    'line': idx + 1,
-                    'description': f"Magic number '{number}' found. What does it represent?",
-                    'suggestion': 'Replace with a named constant to explain its purpose.'
-                })
+                smells.add(MAGIC_NUMBER, 'low', idx + 1, number)
         
         return smells
\ No newline at end of file
@@ -0,0 +1,188 @@
+import ast
+import difflib
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from findings import Findings
+from detector import count_methods
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+def apply_unified_diff(old_code, diff):
+    """Apply a single-file unified diff to `old_code` and return the new code.
+    
+    Raises ValueError if a hunk does not match the old content.
+    """
+    old_lines = old_code.split('\n')
+    new_lines = []
+    pos = 0  # index of the next unconsumed old line
+    lines = diff.split('\n')
+    idx = 0
+    
+    while idx < len(lines):
+        match = HUNK_HEADER.match(lines[idx])
+        idx += 1
+        if not match:
+            continue
+        
+        old_start = int(match.group(1))
+        old_remaining = int(match.group(2)) if match.group(2) is not None else 1
+        new_remaining = int(match.group(4)) if match.group(4) is not None else 1
+        # For a pure insertion the header names the line *before* the hunk
+        start = old_start if old_remaining == 0 else old_start - 1
+        if start < pos:
+            raise ValueError(f"Overlapping hunk at old line {old_start}")
+        new_lines.extend(old_lines[pos:start])
+        pos = start
+        
+        # Consume exactly the number of lines the header announces
+        while old_remaining > 0 or new_remaining > 0:
+            if idx >= len(lines):
+                raise ValueError("Truncated hunk in diff")
+            line = lines[idx]
+            idx += 1
+            if line.startswith('\\'):
+                continue  # "\ No newline at end of file"
+            # Some tools strip the space from blank context lines
+            tag, text = (line[:1], line[1:]) if line else (' ', '')
+            if tag in (' ', '-'):
+                if pos >= len(old_lines) or old_lines[pos] != text:
+                    raise ValueError(f"Diff does not apply at old line {pos + 1}")
+                pos += 1
+                old_remaining -= 1
+                if tag == ' ':
+                    new_lines.append(text)
+                    new_remaining -= 1
+            elif tag == '+':
+                new_lines.append(text)
+                new_remaining -= 1
+            else:
+                raise ValueError(f"Unexpected line in hunk: {line[:40]!r}")
+    
+    new_lines.extend(old_lines[pos:])
+    return '\n'.join(new_lines)
+
+def changed_lines(old_code, new_code):
+    """1-based line numbers in `new_code` that differ from `old_code`.
+    
+    A pure deletion marks the lines on either side of it, so the unit it
+    was removed from is still re-analyzed.
+    """
+    old_lines = old_code.split('\n')
+    new_lines = new_code.split('\n')
+    changed = set()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        if j1 == j2:
+            changed.update({j1, j1 + 1})
+        else:
+            changed.update(range(j1 + 1, j2 + 1))
+    return {line for line in changed if 1 <= line <= len(new_lines)}
+
+def _unit_start(node):
+    return min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+
+def code_units(code):
+    """Split code into units as (name, kind, start, end, info) line spans.
+    
+    Top-level functions and statements are units. A class contributes a
+    'class' unit spanning the whole class, used only for class-level rules,
+    plus one unit per method or other statement in its body. If the code
+    does not parse, the whole file is one unit. `info` is (class line,
+    method count) for 'class' units and None otherwise.
+    """
+    num_lines = len(code.split('\n'))
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return [('<module>', 'module', 1, num_lines, None)]
+    
+    units = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            units.append((node.name, 'function', _unit_start(node), node.end_lineno, None))
+        elif isinstance(node, ast.ClassDef):
+            units.append((node.name, 'class', _unit_start(node), node.end_lineno, (node.lineno, count_methods(node))))
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    units.append((f"{node.name}.{child.name}", 'method', _unit_start(child), child.end_lineno, None))
+                else:
+                    units.append((node.name, 'statement', _unit_start(child), child.end_lineno, None))
+        else:
+            units.append(('<module>', 'statement', _unit_start(node), node.end_lineno, None))
+    return units
+
+class DiffAnalyzer:
+    """Run rule-based detection only on units touched by a change"""
+    
+    def __init__(self, rule_detector, cache=None):
+        self.rule_detector = rule_detector
+        self.cache = cache or LRUCache()
+    
+    def unit_smells(self, source):
+        """Rule findings for one unit, with line numbers relative to the unit"""
+        key = hashlib.sha1(source.encode('utf-8')).digest()
+        smells = self.cache.get(key)
+        if smells is None:
+            smells = self.rule_detector.detect_all(source)
+            self.cache.put(key, smells)
+        return smells
+    
+    def analyze(self, old_code, new_code):
+        changed = changed_lines(old_code, new_code)
+        lines = new_code.split('\n')
+        smells = Findings()
+        changed_units = []
+        total_units = 0
+        
+        for name, kind, start, end, info in code_units(new_code):
+            total_units += 1
+            if not any(start <= line <= end for line in changed):
+                continue
+            changed_units.append({'name': name, 'kind': kind, 'start_line': start, 'end_line': end})
+            if kind == 'class':
+                # Line-based rules are covered by the class body units
+                smells.extend(self.rule_detector.check_god_class(name, *info))
+                continue
+            source = '\n'.join(lines[start - 1:end])
+            smells.extend(self.unit_smells(source).shifted(start - 1))
+        
+        return {
+            'smells': smells,
+            'changed_lines': len(changed),
+            'changed_units': changed_units,
+            'total_units': total_units
+        }
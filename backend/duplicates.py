@@ -0,0 +1,219 @@
+import ast
+import hashlib
+import io
+import keyword
+import os
+import sqlite3
+import textwrap
+import threading
+import tokenize
+import zlib
+import numpy as np
+from findings import Findings, DUPLICATE_CODE
+
+# MinHash / LSH parameters: 16 bands of 8 rows put the LSH candidate
+# threshold near 0.7 Jaccard; candidates are then checked against
+# SIMILARITY_THRESHOLD using the full signature.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+MIN_TOKENS = 40
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.ENCODING, tokenize.ENDMARKER}
+
+def normalize_tokens(source):
+    """Token stream with identifiers and literals replaced by placeholders"""
+    tokens = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(textwrap.dedent(source)).readline):
+            if tok.type in _SKIPPED_TOKENS:
+                continue
+            if tok.type == tokenize.NAME:
+                tokens.append(tok.string if keyword.iskeyword(tok.string) else 'N')
+            elif tok.type == tokenize.NUMBER:
+                tokens.append('0')
+            elif tok.type == tokenize.STRING:
+                tokens.append('S')
+            elif tok.type in (tokenize.INDENT, tokenize.DEDENT):
+                tokens.append(tokenize.tok_name[tok.type])
+            else:
+                tokens.append(tok.string)
+    except (tokenize.TokenError, IndentationError):
+        pass
+    return tokens
+
+def minhash(tokens):
+    """MinHash signature (uint32 array of NUM_PERM) of the token shingles"""
+    shingles = {
+        zlib.crc32(' '.join(tokens[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+    hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+def band_keys(signature):
+    """One 63-bit bucket key per LSH band"""
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little') >> 1)  # fits SQLite INTEGER
+    return keys
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+def function_signatures(code):
+    """(name, line, signature) for every function large enough to compare"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    
+    lines = code.split('\n')
+    results = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        source = '\n'.join(lines[node.lineno - 1:node.end_lineno])
+        tokens = normalize_tokens(source)
+        if len(tokens) < MIN_TOKENS:
+            continue
+        results.append((node.name, node.lineno, minhash(tokens)))
+    return results
+
+class DuplicateDetector:
+    """Cross-file near-duplicate function detection backed by a local LSH index"""
+    
+    def __init__(self, path='duplicate_index.sqlite3'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.pid = None
+    
+    def _connect(self):
+        # SQLite connections must not cross a fork; reopen in each process
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self.pid = os.getpid()
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS functions (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    line INTEGER NOT NULL,
+                    signature BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS functions_source ON functions (source);
+                CREATE TABLE IF NOT EXISTS bands (
+                    band_key INTEGER NOT NULL,
+                    function_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS bands_key ON bands (band_key);
+                CREATE INDEX IF NOT EXISTS bands_function ON bands (function_id);
+                CREATE TABLE IF NOT EXISTS counts (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    functions INTEGER NOT NULL,
+                    sources INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO counts
+                    SELECT 0, COUNT(*), COUNT(DISTINCT source) FROM functions;
+            ''')
+        return self.conn
+    
+    def query(self, signature, exclude_source=None):
+        """Indexed functions similar to `signature` as (similarity, source, name, line)"""
+        keys = band_keys(signature)
+        with self.lock:
+            conn = self._connect()
+            rows = conn.execute(
+                f'''SELECT DISTINCT f.id, f.source, f.name, f.line, f.signature
+                    FROM bands b JOIN functions f ON f.id = b.function_id
+                    WHERE b.band_key IN ({",".join("?" * len(keys))})''',
+                keys
+            ).fetchall()
+        
+        matches = []
+        for _, source, name, line, blob in rows:
+            if source == exclude_source:
+                continue
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= SIMILARITY_THRESHOLD:
+                matches.append((score, source, name, line))
+        return sorted(matches, reverse=True)
+    
+    def index(self, source, signatures):
+        """Replace the indexed functions of `source` with `signatures`"""
+        with self.lock:
+            conn = self._connect()
+            with conn:
+                # Kept in step with the tables so stats() needs no table scan
+                removed, = conn.execute('SELECT COUNT(*) FROM functions WHERE source = ?', (source,)).fetchone()
+                conn.execute(
+                    'UPDATE counts SET functions = functions + ?, sources = sources + ?',
+                    (len(signatures) - removed, bool(signatures) - bool(removed))
+                )
+                conn.execute(
+                    'DELETE FROM bands WHERE function_id IN (SELECT id FROM functions WHERE source = ?)',
+                    (source,)
+                )
+                conn.execute('DELETE FROM functions WHERE source = ?', (source,))
+                for name, line, signature in signatures:
+                    cursor = conn.execute(
+                        'INSERT INTO functions (source, name, line, signature) VALUES (?, ?, ?, ?)',
+                        (source, name, line, signature.tobytes())
+                    )
+                    conn.executemany(
+                        'INSERT INTO bands (band_key, function_id) VALUES (?, ?)',
+                        [(key, cursor.lastrowid) for key in band_keys(signature)]
+                    )
+    
+    def detect(self, code, source=None, update=True):
+        """Find functions in `code` duplicated in the index or in `code` itself.
+        
+        Only code with a caller-supplied `source` (e.g. its repository path)
+        is indexed, replacing that source's old entries. Anonymous snippets
+        are compared against the index but never stored, so edited
+        resubmissions neither match their own earlier versions nor grow it.
+        """
+        signatures = function_signatures(code)
+        smells = Findings()
+        for idx, (name, line, signature) in enumerate(signatures):
+            matches = self.query(signature, exclude_source=source)
+            # Duplicates within the same file
+            for other_name, other_line, other in signatures[:idx]:
+                score = similarity(signature, other)
+                if score >= SIMILARITY_THRESHOLD:
+                    matches.append((score, 'this file', other_name, other_line))
+            if not matches:
+                continue
+            
+            score, where, other_name, other_line = max(matches)
+            smells.add(
+                DUPLICATE_CODE,
+                'high' if score >= 0.95 else 'medium',
+                line,
+                (name, score, other_name, where, other_line)
+            )
+        
+        if update and source is not None:
+            self.index(source, signatures)
+        return smells
+    
+    def stats(self):
+        with self.lock:
+            conn = self._connect()
+            functions, sources = conn.execute('SELECT functions, sources FROM counts').fetchone()
+        return {'functions': functions, 'sources': sources}
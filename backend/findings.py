@@ -0,0 +1,155 @@
+class Rule:
+    """Static metadata shared by every finding of one rule"""
+    __slots__ = ('id', 'index', 'smell_type', 'description', 'suggestion', 'detector')
+    
+    def __init__(self, id, smell_type, description, suggestion, detector='rule-based', index=0):
+        self.id = id
+        self.index = index  # position in RULE_LIST, stored in Findings.rules
+        self.smell_type = smell_type
+        self.description = description  # str.format template filled from the finding's args
+        self.suggestion = suggestion
+        self.detector = detector
+
+RULES = {}
+RULE_LIST = []
+
+def register(*args, **kwargs):
+    rule = Rule(*args, index=len(RULE_LIST), **kwargs)
+    RULES[rule.id] = rule
+    RULE_LIST.append(rule)
+    return rule
+
+LONG_METHOD = register(
+    'long-method', 'Long Method',
+    "Method '{0}' has {1} lines. Methods should be under 25 lines.",
+    'Break this method into smaller, focused functions. Each function should do one thing well.'
+)
+TOO_MANY_PARAMETERS = register(
+    'too-many-parameters', 'Too Many Parameters',
+    "Function '{0}' has {1} parameters. Keep it under 5 for better readability.",
+    'Consider grouping related parameters into a configuration object or dataclass.'
+)
+DEEP_NESTING = register(
+    'deep-nesting', 'Deep Nesting',
+    "Code has {0} levels of nesting. This makes it hard to understand and test.",
+    'Use early returns, extract methods, or use guard clauses to reduce nesting.'
+)
+GOD_CLASS = register(
+    'god-class', 'God Class',
+    "Class '{0}' has {1} methods. It likely has too many responsibilities.",
+    'Apply Single Responsibility Principle. Split this class into smaller, focused classes.'
+)
+MAGIC_NUMBER = register(
+    'magic-number', 'Magic Number',
+    "Magic number '{0}' found. What does it represent?",
+    'Replace with a named constant to explain its purpose.'
+)
+DUPLICATE_CODE = register(
+    'duplicate-code', 'Duplicate Code',
+    "Function '{0}' is ~{1:.0%} similar to '{2}' ({3}, line {4}).",
+    'Extract the shared logic into a single function or module and reuse it.'
+)
+ML_SMELL = register(
+    'ml-detected-smell', 'ML Detected Smell',
+    "ML model detected potential code smell with {0:.1%} confidence",
+    'Review the code structure and consider refactoring based on rule-based suggestions',
+    detector='ml'
+)
+
+SEVERITIES = ('high', 'medium', 'low')
+SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITIES)}
+
+def format_description(rule, args):
+    """Fill the rule's template from a finding's args (a tuple or one bare value)"""
+    if type(args) is tuple:
+        return rule.description.format(*args)
+    return rule.description.format(args)
+
+class Findings:
+    """Column-oriented list of findings.
+    
+    Each finding is one position in parallel lists: rule index, severity
+    code, line and description args. Ints, strings and tuples of them are
+    not traced by the garbage collector, so a request's findings are four
+    tracked containers instead of one tracked object per finding. Per
+    request, collector work is dominated by the detectors' AST walks;
+    the pause itself is cut by server.freeze_shared_state(), not by this
+    layout.
+    """
+    __slots__ = ('rules', 'severities', 'lines', 'args')
+    
+    def __init__(self):
+        self.rules = []
+        self.severities = []
+        self.lines = []
+        self.args = []
+    
+    def add(self, rule, severity, line, args=()):
+        """Append a finding; single-placeholder rules pass the bare value as args"""
+        self.rules.append(rule.index)
+        self.severities.append(SEVERITY_CODES[severity])
+        self.lines.append(line)
+        self.args.append(args)
+    
+    def extend(self, other):
+        self.rules.extend(other.rules)
+        self.severities.extend(other.severities)
+        self.lines.extend(other.lines)
+        self.args.extend(other.args)
+    
+    def shifted(self, offset):
+        """Copy with every line number moved by `offset`"""
+        result = Findings()
+        result.rules = list(self.rules)
+        result.severities = list(self.severities)
+        result.lines = [line + offset for line in self.lines]
+        result.args = list(self.args)
+        return result
+    
+    def __len__(self):
+        return len(self.lines)
+    
+    def __repr__(self):
+        return f"Findings({len(self)} findings)"
+    
+    def interned_descriptions(self):
+        """(unique descriptions, index into them for each finding).
+        
+        Each distinct (rule, args) pair is formatted only once.
+        """
+        descriptions = []
+        ids = []
+        seen = [{} for _ in RULE_LIST]
+        for rule, args in zip(self.rules, self.args):
+            by_args = seen[rule]
+            idx = by_args.get(args)
+            if idx is None:
+                idx = by_args[args] = len(descriptions)
+                descriptions.append(format_description(RULE_LIST[rule], args))
+            ids.append(idx)
+        return descriptions, ids
+
+def collect(*groups):
+    """Dedupe findings by (rule, line) and order them by severity in one pass.
+    
+    The first finding for a (rule, line) pair wins; order within a severity
+    follows input order, matching a stable sort by severity.
+    """
+    buckets = [Findings() for _ in SEVERITIES]
+    seen = set()
+    for group in groups:
+        for rule, severity, line, args in zip(group.rules, group.severities, group.lines, group.args):
+            key = line << 8 | rule
+            if key in seen:
+                continue
+            seen.add(key)
+            bucket = buckets[severity]
+            bucket.rules.append(rule)
+            bucket.severities.append(severity)
+            bucket.lines.append(line)
+            bucket.args.append(args)
+    
+    result = buckets[0]
+    for bucket in buckets[1:]:
+        result.extend(bucket)
+    return result
@@ -0,0 +1,269 @@
+import csv
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+SIZE_BUCKETS = [(0, 20, '<20 lines'), (20, 100, '20-99 lines'), (100, 500, '100-499 lines'), (500, None, '500+ lines')]
+
+def size_bucket(code):
+    lines = code.count('\n') + 1
+    for low, high, label in SIZE_BUCKETS:
+        if lines >= low and (high is None or lines < high):
+            return label
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+def load_corpus(csv_path=None, synthetic=0, store=None, seed=42):
+    """List of code strings from a CSV, a dataset store or the synthetic generator"""
+    if synthetic:
+        from create_dataset import iter_samples
+        stream = iter_samples(random.Random(seed))
+        return [next(stream)['code'] for _ in range(synthetic)]
+    if store:
+        from dataset_store import DatasetStore
+        dataset = DatasetStore(store)
+        return [dataset.code(row) for row in range(len(dataset))]
+    
+    csv.field_size_limit(sys.maxsize)
+    with open(csv_path, newline='') as f:
+        return [row['code'] for row in csv.DictReader(f) if row['code'].strip()]
+
+class Client:
+    """One keep-alive HTTP connection per thread"""
+    
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.local = threading.local()
+    
+    def request(self, method, path, body=None):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            return response.status, data
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            raise
+    
+    def get_json(self, path):
+        status, data = self.request('GET', path)
+        return json.loads(data) if status == 200 else {}
+
+def run_step(client, corpus, duration, concurrency=None, rate=None, seed=0):
+    """Drive load for `duration` seconds; returns a list of (bucket, latency_ms, ok)"""
+    rng = random.Random(seed)
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    
+    def send(code, scheduled):
+        body = json.dumps({'code': code}).encode('utf-8')
+        try:
+            status, _ = client.request('POST', '/analyze', body)
+            ok = status == 200
+        except Exception:
+            ok = False
+        # Measured from the scheduled start so queueing delay is included
+        latency = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            results.append((size_bucket(code), latency, ok))
+    
+    if rate:
+        # Open loop: Poisson arrivals at `rate` requests/s regardless of latency
+        with ThreadPoolExecutor(max_workers=512) as pool:
+            next_at = time.perf_counter()
+            while next_at < deadline:
+                now = time.perf_counter()
+                if next_at > now:
+                    time.sleep(next_at - now)
+                pool.submit(send, rng.choice(corpus), next_at)
+                next_at += rng.expovariate(rate)
+    else:
+        # Closed loop: `concurrency` users each sending back-to-back
+        def user(worker_seed):
+            user_rng = random.Random(worker_seed)
+            while time.perf_counter() < deadline:
+                send(user_rng.choice(corpus), time.perf_counter())
+        
+        threads = [threading.Thread(target=user, args=(seed * 1000 + i,)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    
+    return results
+
+def summarize(results, elapsed):
+    latencies = sorted(latency for _, latency, _ in results)
+    errors = sum(1 for _, _, ok in results if not ok)
+    summary = {
+        'requests': len(results),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'by_size': {}
+    }
+    for _, _, label in SIZE_BUCKETS:
+        bucket = sorted(latency for b, latency, _ in results if b == label)
+        if bucket:
+            summary['by_size'][label] = {
+                'requests': len(bucket),
+                'p50_ms': round(percentile(bucket, 50), 2),
+                'p99_ms': round(percentile(bucket, 99), 2)
+            }
+    return summary
+
+def find_saturation(steps):
+    """First load level where adding load stops adding throughput.
+    
+    Closed loop: throughput grows < 10% over the previous step while p99
+    grows > 50%. Open loop: achieved throughput falls below 90% of the
+    offered rate, or more than 1% of requests fail.
+    """
+    for prev, step in zip([None] + steps, steps):
+        if step['error_rate'] > 0.01:
+            return step['load']
+        if 'rate' in step['load']:
+            if step['throughput_rps'] < 0.9 * step['load']['rate']:
+                return step['load']
+        elif prev is not None:
+            gain = step['throughput_rps'] / max(prev['throughput_rps'], 1e-9)
+            if gain < 1.1 and step['p99_ms'] > 1.5 * prev['p99_ms']:
+                return step['load']
+    return None
+
+def start_server(port, workers):
+    """Start the API from this directory and wait until /health answers"""
+    # No watcher reloads mid-run, and no writes into a real duplicate index
+    env = dict(os.environ, MODEL_WATCH_INTERVAL='0', DUPLICATE_INDEX='')
+    process = subprocess.Popen(
+        [sys.executable, 'app.py', '--port', str(port), '--workers', str(workers)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    client = Client(f'http://127.0.0.1:{port}')
+    for _ in range(120):
+        try:
+            if client.request('GET', '/health')[0] == 200:
+                return process
+        except Exception:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("API did not become healthy within 60s")
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n📈 Compared with {previous_path} ({previous.get('git_revision')}):")
+    old_steps = {json.dumps(s['load'], sort_keys=True): s for s in previous['steps']}
+    for step in current['steps']:
+        old = old_steps.get(json.dumps(step['load'], sort_keys=True))
+        if old is None:
+            continue
+        d_rps = (step['throughput_rps'] - old['throughput_rps']) / max(old['throughput_rps'], 1e-9) * 100
+        d_p99 = (step['p99_ms'] - old['p99_ms']) / max(old['p99_ms'], 1e-9) * 100
+        print(f"   {step['load']}: throughput {d_rps:+.1f}%, p99 {d_p99:+.1f}%")
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Replay a code corpus against the API and report latency SLOs")
+    parser.add_argument('--url', help="Target an already running API instead of starting one")
+    parser.add_argument('--port', type=int, default=8765, help="Port for the locally started API")
+    parser.add_argument('--workers', type=int, default=1, help="Workers for the locally started API")
+    parser.add_argument('--csv', default='data/code_samples.csv', help="Corpus CSV (default: data/code_samples.csv)")
+    parser.add_argument('--store', help="Use a dataset store directory as the corpus")
+    parser.add_argument('--synthetic', type=int, default=0, help="Use N samples from the synthetic generator")
+    parser.add_argument('--concurrency', default='1,2,4,8,16', help="Closed-loop concurrency levels")
+    parser.add_argument('--rate', help="Open-loop arrival rates in requests/s (overrides --concurrency)")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per load level")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default='loadtest_runs', help="Directory to save the run")
+    parser.add_argument('--compare', help="Previous run JSON to compare against")
+    args = parser.parse_args()
+    
+    corpus = load_corpus(args.csv, args.synthetic, args.store, args.seed)
+    print(f"📦 Corpus: {len(corpus)} samples")
+    
+    process = None
+    url = args.url
+    if url is None:
+        print(f"🚀 Starting API on port {args.port} with {args.workers} worker(s)...")
+        process = start_server(args.port, args.workers)
+        url = f'http://127.0.0.1:{args.port}'
+    client = Client(url)
+    
+    try:
+        info = client.get_json('/')
+        health = client.get_json('/health')
+        levels = [('rate', float(x)) for x in args.rate.split(',')] if args.rate else \
+                 [('concurrency', int(x)) for x in args.concurrency.split(',')]
+        
+        steps = []
+        for kind, level in levels:
+            started = time.perf_counter()
+            results = run_step(client, corpus, args.duration, seed=args.seed,
+                               **{kind: level})
+            step = summarize(results, time.perf_counter() - started)
+            step['load'] = {kind: level}
+            steps.append(step)
+            print(f"   {kind}={level}: {step['throughput_rps']} req/s, "
+                  f"p50 {step['p50_ms']} ms, p99 {step['p99_ms']} ms, errors {step['error_rate']:.1%}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    
+    saturation = find_saturation(steps)
+    print(f"\n🎯 Saturation point: {saturation or 'not reached'}")
+    print("\n📊 Latency by input size (highest load level):")
+    for label, stats in steps[-1]['by_size'].items():
+        print(f"   {label}: {stats['requests']} requests, p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+    
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_revision': git_revision(),
+        'api_version': info.get('version'),
+        'model_version': health.get('model_version'),
+        'duplicate_index': health.get('duplicate_index') is not None,
+        'url': url,
+        'corpus': {'csv': None if (args.synthetic or args.store) else args.csv, 'store': args.store,
+                   'synthetic': args.synthetic, 'size': len(corpus), 'seed': args.seed},
+        'duration_per_step': args.duration,
+        'saturation': saturation,
+        'steps': steps
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{time.strftime('%Y%m%d-%H%M%S')}-{run['git_revision'] or 'unknown'}.json")
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\n💾 Saved run to: {path}")
+    
+    if args.compare:
+        print_comparison(run, args.compare)
@@ -1,38 +1,239 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
 import joblib
 import pandas as pd
 from utils import extract_features
+from monitoring import DriftMonitor
+
+# Small, fixed inputs every candidate model must score before it is swapped in
+CANARY_SNIPPETS = [
+    "def add(a, b):\n    return a + b",
+    "def create_user(name, email, password, age, country, city, zipcode, phone):\n    return User(name, email, password, age, country, city, zipcode, phone)",
+    "def check(data):\n    if data:\n        if data.user:\n            if data.user.age:\n                if data.user.age > 18:\n                    return True\n    return False",
+    "class Calculator:\n    def add(self, a, b):\n        return a + b\n\n    def subtract(self, a, b):\n        return a - b",
+]
+
+# Written by train_model.py after both artifacts are in place; lists the
+# SHA-256 of the model and scaler that belong together
+MANIFEST_PATH = 'model_manifest.json'
+
+def artifact_version(*paths):
+    """Short content hash identifying a set of model artifacts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+def write_manifest(paths, manifest_path=MANIFEST_PATH):
+    """Record the artifacts in `paths` as one matching set"""
+    manifest = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            manifest[os.path.basename(path)] = hashlib.sha256(f.read()).hexdigest()
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
 
 class MLDetector:
     """ML-based code smell detection"""
     
-    def __init__(self):
+    def __init__(self, model_path='ml_model.pkl', scaler_path='scaler.pkl', profile_path='feature_profile.pkl',
+                 manifest_path=MANIFEST_PATH):
         """Load trained model and scaler"""
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.profile_path = profile_path
+        self.manifest_path = manifest_path
+        self.reload_lock = threading.Lock()
+        self.watcher = None
+        
+        # (model, scaler, version) is replaced as a whole, so readers that
+        # take one snapshot never see a model paired with the wrong scaler
         try:
-            self.model = joblib.load('ml_model.pkl')
-            self.scaler = joblib.load('scaler.pkl')
-            print("✅ ML model loaded successfully")
+            self.state = self._load(strict=False)
+            print(f"✅ ML model loaded successfully (version {self.version})")
         except Exception as e:
             print(f"⚠️  Warning: Could not load ML model: {e}")
-            self.model = None
-            self.scaler = None
+            self.state = (None, None, None)
+        
+        self.monitor = DriftMonitor(self._load_profile())
+    
+    @property
+    def model(self):
+        return self.state[0]
+    
+    @property
+    def scaler(self):
+        return self.state[1]
+    
+    @property
+    def version(self):
+        return self.state[2]
+    
+    def _load(self, strict=True):
+        """(model, scaler, version) from one read of each artifact.
+        
+        train_model.py replaces the two files one after the other, so a
+        load in between would pair a new scaler with the old model. With
+        `strict`, the bytes read here must match the manifest written after
+        both; otherwise a mismatch (e.g. a model retrained without
+        regenerating the manifest) is only reported.
+        """
+        version = hashlib.sha256()
+        blobs = []
+        for path in (self.model_path, self.scaler_path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            version.update(data)
+            blobs.append((os.path.basename(path), data))
+        
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            for name, data in blobs:
+                if manifest.get(name) != hashlib.sha256(data).hexdigest():
+                    if strict:
+                        raise ValueError(f"{name} does not match {self.manifest_path}; artifacts are mid-update")
+                    print(f"⚠️  Warning: {name} does not match {self.manifest_path}; loading it anyway")
+        
+        model, scaler = (joblib.load(io.BytesIO(data)) for _, data in blobs)
+        return model, scaler, version.hexdigest()[:12]
+    
+    def _load_profile(self):
+        # Training-time feature profile, saved by train_model.py
+        try:
+            return joblib.load(self.profile_path)
+        except Exception:
+            return None
+    
+    def _score(self, model, scaler, code):
+        features = extract_features(code)
+        if features is None:
+            return None, None
+        features_scaled = scaler.transform(pd.DataFrame([features]))
+        return features, model.predict_proba(features_scaled)[0]
+    
+    def validate(self, state):
+        """Warm up a candidate (model, scaler, version) on the canary set.
+        
+        Raises ValueError if any canary fails to score or yields invalid
+        probabilities. Returns agreement with the current model.
+        """
+        model, scaler, _ = state
+        if getattr(scaler, 'n_features_in_', None) != getattr(model, 'n_features_in_', None):
+            raise ValueError("Scaler and model were fitted on different feature counts")
+        agree = 0
+        for code in CANARY_SNIPPETS:
+            _, probabilities = self._score(model, scaler, code)
+            if probabilities is None or len(probabilities) != 2:
+                raise ValueError(f"Canary produced no prediction: {code[:30]!r}")
+            if not all(0.0 <= p <= 1.0 for p in probabilities) or abs(sum(probabilities) - 1.0) > 1e-6:
+                raise ValueError(f"Canary produced invalid probabilities: {list(probabilities)}")
+            
+            current_model, current_scaler, _ = self.state
+            if current_model is not None:
+                _, current = self._score(current_model, current_scaler, code)
+                agree += int((probabilities[1] >= 0.5) == (current[1] >= 0.5))
+        
+        return agree / len(CANARY_SNIPPETS) if self.model is not None else None
+    
+    def reload(self, force=False):
+        """Load, validate and atomically swap in the model artifacts on disk"""
+        with self.reload_lock:
+            try:
+                version = artifact_version(self.model_path, self.scaler_path)
+            except OSError as e:
+                return {'status': 'error', 'error': str(e), 'version': self.version}
+            if version == self.version and not force:
+                return {'status': 'unchanged', 'version': version}
+            
+            started = time.perf_counter()
+            try:
+                # Only a served model is worth protecting from a mid-update swap
+                state = self._load(strict=self.model is not None)
+                agreement = self.validate(state)
+            except Exception as e:
+                print(f"⚠️  Rejected model reload: {e}")
+                return {'status': 'rejected', 'error': str(e), 'version': self.version}
+            
+            previous = self.version
+            monitor = DriftMonitor(self._load_profile())
+            self.state = state
+            self.monitor = monitor
+            print(f"🔄 Swapped ML model {previous} -> {state[2]}")
+            return {
+                'status': 'reloaded',
+                'previous_version': previous,
+                'version': state[2],
+                'canary_agreement': agreement,
+                'load_seconds': round(time.perf_counter() - started, 3)
+            }
+    
+    def start_watcher(self, interval=10.0):
+        """Poll the artifacts and reload once they have stopped changing"""
+        if self.watcher is not None or interval <= 0:
+            return
+        
+        def mtimes():
+            # The manifest is written last, so its change retries a reload
+            # that was rejected while the artifacts were being replaced
+            try:
+                paths = [self.model_path, self.scaler_path]
+                if os.path.exists(self.manifest_path):
+                    paths.append(self.manifest_path)
+                return tuple(os.stat(path).st_mtime_ns for path in paths)
+            except OSError:
+                return None
+        
+        def watch():
+            seen = mtimes()
+            pending = None
+            while True:
+                time.sleep(interval)
+                current = mtimes()
+                if current is None or current == seen:
+                    pending = None
+                    continue
+                # Wait one more interval so a half-written artifact is not loaded
+                if current != pending:
+                    pending = current
+                    continue
+                result = self.reload()
+                if result['status'] != 'error':
+                    seen = current
+                pending = None
+        
+        self.watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self.watcher.start()
     
     def predict(self, code):
         """Predict if code has smells using ML model"""
-        if self.model is None:
+        model, scaler, version = self.state
+        if model is None:
             return {
                 'has_smell': False,
                 'confidence': 0.0,
-                'features': None
+                'features': None,
+                'model_version': None
             }
         
         try:
             # Extract features
+            start = time.perf_counter()
             features = extract_features(code)
             if features is None:
+                self.monitor.record(None, (time.perf_counter() - start) * 1000)
                 return {
                     'has_smell': False,
                     'confidence': 0.0,
                     'features': None,
+                    'model_version': version,
                     'error': 'Failed to extract features'
                 }
             
@@ -40,19 +241,22 @@ class MLDetector:
             feature_df = pd.DataFrame([features])
             
             # Scale features
-            features_scaled = self.scaler.transform(feature_df)
+            features_scaled = scaler.transform(feature_df)
             
             # Predict
-            prediction = self.model.predict(features_scaled)[0]
+            prediction = model.predict(features_scaled)[0]
             
             # Get prediction probability
-            probabilities = self.model.predict_proba(features_scaled)[0]
+            probabilities = model.predict_proba(features_scaled)[0]
             confidence = probabilities[prediction]
             
+            self.monitor.record(features, (time.perf_counter() - start) * 1000)
+            
             return {
                 'has_smell': bool(prediction),
                 'confidence': float(confidence),
                 'features': features,
+                'model_version': version,
                 'probabilities': {
                     'clean': float(probabilities[0]),
                     'smell': float(probabilities[1])
@@ -65,9 +269,22 @@ class MLDetector:
                 'has_smell': False,
                 'confidence': 0.0,
                 'features': None,
+                'model_version': version,
                 'error': str(e)
             }
     
+    def smell_probability(self, code):
+        """Smell probability without recording drift or latency (None if unavailable)"""
+        model, scaler, _ = self.state
+        if model is None:
+            return None
+        try:
+            _, probabilities = self._score(model, scaler, code)
+        except Exception as e:
+            print(f"Error in ML prediction: {e}")
+            return None
+        return None if probabilities is None else float(probabilities[1])
+    
     def get_feature_importance(self):
         """Get feature importance from the model"""
         if self.model is None:
@@ -88,4 +305,4 @@ class MLDetector:
                 for name, importance in zip(feature_names, importances)
             }
         except:
-            return None
\ No newline at end of file
+            return None
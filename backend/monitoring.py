@@ -0,0 +1,180 @@
+import math
+import threading
+from bisect import bisect_right
+import numpy as np
+from utils import FEATURE_NAMES
+
+# PSI thresholds commonly used for "no drift" / "moderate" / "significant"
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Below this many observations PSI is too noisy to report a status
+MIN_OBSERVATIONS = 30
+
+def build_profile(X, bins=10):
+    """Summarize the training feature distribution for later drift checks.
+    
+    Bin edges are training quantiles, so each bin holds roughly the same
+    share of training rows. At drift-check time, values outside the
+    training range are counted in two extra open-ended bins whose expected
+    share is zero (see FeatureHistogram).
+    """
+    profile = {'rows': int(len(X)), 'features': {}}
+    for name in FEATURE_NAMES:
+        values = np.asarray(X[name], dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])).tolist()
+        counts = np.bincount(
+            [bisect_right(edges, v) for v in values], minlength=len(edges) + 1
+        )
+        profile['features'][name] = {
+            'edges': edges,
+            'expected': (counts / max(len(values), 1)).tolist(),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'std': float(values.std())
+        }
+    return profile
+
+def population_stability_index(expected, observed, eps=1e-4):
+    """PSI between two discrete distributions over the same bins"""
+    total = sum(observed)
+    if total == 0:
+        return 0.0
+    psi = 0.0
+    for e, o in zip(expected, observed):
+        e = max(e, eps)
+        o = max(o / total, eps)
+        psi += (o - e) * math.log(o / e)
+    return psi
+
+class FeatureHistogram:
+    """Streaming histogram over a feature's training bins plus below/above-range bins"""
+    
+    def __init__(self, stats):
+        self.edges = stats['edges']
+        self.low = stats['min']
+        self.high = stats['max']
+        self.counts = [0] * (len(self.edges) + 1)
+        self.below = 0
+        self.above = 0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value):
+        if value < self.low:
+            self.below += 1
+        elif value > self.high:
+            self.above += 1
+        else:
+            self.counts[bisect_right(self.edges, value)] += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+    
+    def observed(self):
+        return [self.below, *self.counts, self.above]
+
+class LatencyHistogram:
+    """Log-scale latency buckets from 0.1 ms to ~100 s with percentile estimates"""
+    
+    def __init__(self, start_ms=0.1, factor=1.25, buckets=64):
+        self.bounds = [start_ms * factor ** i for i in range(buckets)]
+        self.counts = [0] * (buckets + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def add(self, ms):
+        self.counts[bisect_right(self.bounds, ms)] += 1
+        self.total += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+    
+    def percentile(self, q):
+        """Upper bound of the bucket containing the q-th percentile"""
+        if self.total == 0:
+            return 0.0
+        target = q / 100 * self.total
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.bounds[idx], self.max) if idx < len(self.bounds) else self.max
+        return self.max
+    
+    def summary(self):
+        return {
+            'count': self.total,
+            'mean_ms': round(self.sum / self.total, 3) if self.total else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max, 3)
+        }
+
+class DriftMonitor:
+    """Streaming feature drift and inference latency statistics"""
+    
+    def __init__(self, profile=None):
+        self.lock = threading.Lock()
+        self.profile = profile
+        self.reset()
+    
+    def reset(self):
+        with self.lock:
+            self.latency = LatencyHistogram()
+            self.failures = 0
+            self.histograms = {}
+            if self.profile:
+                self.histograms = {
+                    name: FeatureHistogram(stats)
+                    for name, stats in self.profile['features'].items()
+                }
+    
+    def record(self, features, latency_ms):
+        """Record one prediction; `features` may be None if extraction failed"""
+        with self.lock:
+            self.latency.add(latency_ms)
+            if features is None:
+                self.failures += 1
+                return
+            for name, histogram in self.histograms.items():
+                histogram.add(float(features[name]))
+    
+    def report(self):
+        with self.lock:
+            report = {
+                'profile_loaded': self.profile is not None,
+                'latency': self.latency.summary(),
+                'extraction_failures': self.failures,
+                'features': {}
+            }
+            worst = 0.0
+            observed = 0
+            for name, histogram in self.histograms.items():
+                stats = self.profile['features'][name]
+                # No training row fell outside [min, max]; eps keeps PSI finite
+                bins = histogram.observed()
+                observed = sum(bins)
+                psi = population_stability_index([0.0, *stats['expected'], 0.0], bins)
+                worst = max(worst, psi)
+                report['features'][name] = {
+                    'psi': round(psi, 4),
+                    'observed': observed,
+                    'out_of_range': round((histogram.below + histogram.above) / max(observed, 1), 4),
+                    'training_range': [stats['min'], stats['max']],
+                    'observed_range': [histogram.min, histogram.max] if observed else None
+                }
+        
+        if self.profile is None:
+            report['status'] = 'unavailable'
+        elif observed < MIN_OBSERVATIONS:
+            report['status'] = 'insufficient_data'
+        elif worst >= PSI_SIGNIFICANT:
+            report['status'] = 'drift'
+        elif worst >= PSI_MODERATE:
+            report['status'] = 'warning'
+        else:
+            report['status'] = 'ok'
+        report['max_psi'] = round(worst, 4)
+        return report
@@ -0,0 +1,113 @@
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+# Functions whose cumulative time is reported as a pipeline stage
+STAGES = {
+    'rules': ('detector.py', 'detect_all'),
+    'duplicates': ('duplicates.py', 'detect'),
+    'features': ('utils.py', 'extract_features'),
+    'ml': ('ml_model.py', 'predict'),
+}
+
+def function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # built-in
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+class RequestProfiler:
+    """Opt-in cProfile sampling of requests into a bounded ring buffer"""
+    
+    def __init__(self, sample_rate=0.0, capacity=50):
+        self.sample_rate = sample_rate
+        self.profiles = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        # Only one profile runs at a time; others fall back to the normal path
+        self.busy = threading.Lock()
+        self.skipped = 0
+    
+    def should_profile(self, headers, allow_header=True):
+        """Sampled at sample_rate, or on request via X-Debug-Profile when allowed"""
+        if allow_header and headers.get('x-debug-profile', '').lower() in ('1', 'true', 'yes'):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def run(self, func, *args, input_hash=None):
+        """Call func(*args), profiling it unless another profile is running"""
+        if not self.busy.acquire(blocking=False):
+            self.skipped += 1
+            return func(*args)
+        
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.busy.release()
+            self._store(profiler, input_hash, duration)
+    
+    def _store(self, profiler, input_hash, duration_ms):
+        raw = pstats.Stats(profiler).stats
+        functions = {
+            func: (nc, tt, ct)
+            for func, (cc, nc, tt, ct, callers) in raw.items()
+        }
+        stages = {}
+        for stage, (filename, name) in STAGES.items():
+            for (path, _, func_name), (_, _, ct) in functions.items():
+                if func_name == name and path.endswith(filename):
+                    stages[stage] = round(ct * 1000, 3)
+        entry = {
+            'input_hash': input_hash,
+            'timestamp': time.time(),
+            'duration_ms': round(duration_ms, 3),
+            'stages_ms': stages,
+            'functions': functions
+        }
+        with self.lock:
+            self.profiles.append(entry)
+    
+    def report(self, sort='tottime', limit=30):
+        """Hot functions aggregated over every buffered profile"""
+        with self.lock:
+            profiles = list(self.profiles)
+        
+        totals = {}
+        for entry in profiles:
+            for func, (nc, tt, ct) in entry['functions'].items():
+                calls, tottime, cumtime = totals.get(func, (0, 0.0, 0.0))
+                totals[func] = (calls + nc, tottime + tt, cumtime + ct)
+        
+        column = {'calls': 0, 'tottime': 1, 'cumtime': 2}.get(sort, 1)
+        hot = sorted(totals.items(), key=lambda item: item[1][column], reverse=True)[:limit]
+        
+        return {
+            'sample_rate': self.sample_rate,
+            'profiles': len(profiles),
+            'capacity': self.profiles.maxlen,
+            'skipped_busy': self.skipped,
+            'hot_functions': [
+                {
+                    'function': function_label(func),
+                    'calls': calls,
+                    'tottime_ms': round(tottime * 1000, 3),
+                    'cumtime_ms': round(cumtime * 1000, 3)
+                }
+                for func, (calls, tottime, cumtime) in hot
+            ],
+            'recent': [
+                {
+                    'input_hash': entry['input_hash'],
+                    'timestamp': entry['timestamp'],
+                    'duration_ms': entry['duration_ms'],
+                    'stages_ms': entry['stages_ms']
+                }
+                for entry in reversed(profiles)
+            ]
+        }
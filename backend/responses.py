@@ -0,0 +1,107 @@
+import gzip
+import json
+from starlette.responses import Response
+from findings import RULE_LIST, SEVERITIES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+def encode_json(payload):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+
+def full_smells(findings):
+    """SmellResult-shaped dicts for a Findings list"""
+    descriptions, ids = findings.interned_descriptions()
+    rules = [(rule.smell_type, rule.suggestion, rule.detector) for rule in RULE_LIST]
+    smells = []
+    for rule, severity, line, idx in zip(findings.rules, findings.severities, findings.lines, ids):
+        smell_type, suggestion, detector = rules[rule]
+        smells.append({
+            'smell_type': smell_type,
+            'severity': SEVERITIES[severity],
+            'line_number': line,
+            'description': descriptions[idx],
+            'suggestion': suggestion,
+            'detector': detector
+        })
+    return smells
+
+def compact_smells(findings):
+    """Intern repeated strings of a Findings list into lookup tables.
+    
+    Returns rules keyed by rule id (smell type, suggestion, detector), a
+    table of unique descriptions, and one row per finding:
+    [rule_id, severity, line_number, description_index].
+    """
+    descriptions, ids = findings.interned_descriptions()
+    rules = {}
+    rows = []
+    
+    for rule_index, severity, line, idx in zip(findings.rules, findings.severities, findings.lines, ids):
+        rule = RULE_LIST[rule_index]
+        if rule.id not in rules:
+            rules[rule.id] = {
+                'smell_type': rule.smell_type,
+                'suggestion': rule.suggestion,
+                'detector': rule.detector
+            }
+        # Tuples of plain values are untracked by the collector; lists are not
+        rows.append((rule.id, SEVERITIES[severity], line, idx))
+    
+    return {
+        'format': 'compact',
+        'columns': ['rule', 'severity', 'line_number', 'description'],
+        'rules': rules,
+        'descriptions': descriptions,
+        'rows': rows
+    }
+
+def negotiate_encoding(accept_encoding):
+    """Pick zstd or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    
+    if zstandard is not None and accepted.get('zstd', 0) > 0:
+        return 'zstd'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+def json_response(payload, accept_encoding=None, status_code=200):
+    """Build a JSON response, compressing it if the client accepts it"""
+    body = encode_json(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        headers['Content-Encoding'] = 'zstd'
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
@@ -0,0 +1,174 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+
+def read_memory(pid):
+    """Resident and proportional set size of a process in MB (Linux only)"""
+    memory = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    memory['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+        # PSS splits shared pages between the processes mapping them
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    memory['pss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+def freeze_shared_state():
+    """Keep preloaded objects from being copied into every worker.
+    
+    A full collection followed by gc.freeze() moves everything loaded so
+    far (sklearn estimators, detectors, module state) into the permanent
+    generation, so the collector in a worker never writes to those object
+    headers and their pages stay shared copy-on-write. The large numpy
+    buffers inside the model live outside the object headers and are only
+    read, so they stay shared as well.
+    """
+    gc.collect()
+    gc.freeze()
+
+# Sent by a worker to the parent, which relays it to every worker
+RELOAD_SIGNAL = signal.SIGUSR1
+
+def is_prefork_worker():
+    return os.environ.get('PREFORK_PARENT') == str(os.getppid())
+
+def broadcast_reload():
+    """Ask every pre-fork worker to reload; False when not running pre-fork"""
+    if not is_prefork_worker():
+        return False
+    os.kill(os.getppid(), RELOAD_SIGNAL)
+    return True
+
+def serve(app, host='0.0.0.0', port=8000, workers=2, log_level='info',
+          max_restarts=5, restart_window=60.0):
+    """Serve `app` from `workers` processes forked from this (preloaded) one.
+    
+    Workers that die are restarted with exponential backoff. If more than
+    `max_restarts` deaths happen within `restart_window` seconds the
+    server stops every worker and exits with status 1.
+    """
+    import uvicorn
+    
+    started = time.perf_counter()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    
+    freeze_shared_state()
+    os.environ['PREFORK_PARENT'] = str(os.getpid())
+    
+    children = {}
+    
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Ignored until the app installs its handler at startup
+            signal.signal(RELOAD_SIGNAL, signal.SIG_IGN)
+            config = uvicorn.Config(app, log_level=log_level)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children[pid] = time.perf_counter()
+        return pid
+    
+    for _ in range(workers):
+        spawn()
+    
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    def relay(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, RELOAD_SIGNAL)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(RELOAD_SIGNAL, relay)
+    
+    print(f"👷 Started {workers} workers on http://{host}:{port} in {time.perf_counter() - started:.2f}s")
+    time.sleep(1)
+    print(f"   parent {os.getpid()}: {read_memory(os.getpid())}")
+    for pid in children:
+        print(f"   worker {pid}: {read_memory(pid)}")
+    
+    # Replace workers that die unexpectedly until asked to stop
+    deaths = deque()
+    failed = False
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.pop(pid, None)
+        if stopping:
+            continue
+        
+        now = time.perf_counter()
+        deaths.append(now)
+        while deaths[0] < now - restart_window:
+            deaths.popleft()
+        if len(deaths) > max_restarts:
+            print(f"❌ {len(deaths)} worker exits within {restart_window:.0f}s, shutting down")
+            failed = True
+            stop(None, None)
+            continue
+        
+        delay = min(0.5 * 2 ** (len(deaths) - 1), 10.0)
+        print(f"⚠️  Worker {pid} exited with status {status}, restarting in {delay:.1f}s")
+        time.sleep(delay)
+        if not stopping:
+            new_pid = spawn()
+            print(f"   worker {new_pid}: started")
+    
+    sock.close()
+    print("👋 All workers stopped")
+    if failed:
+        sys.exit(1)
+
+def worker_stats():
+    """This worker's memory and, under the pre-fork server, its siblings'"""
+    stats = {'pid': os.getpid(), **read_memory(os.getpid())}
+    if not is_prefork_worker():
+        return stats
+    parent = os.environ['PREFORK_PARENT']
+    
+    siblings = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = f.read().rsplit(')', 1)[1].split()[1]
+        except (OSError, IndexError):
+            continue
+        if ppid == parent:
+            siblings.append({'pid': int(entry), **read_memory(entry)})
+    stats['parent'] = {'pid': int(parent), **read_memory(parent)}
+    stats['workers'] = siblings
+    return stats
@@ -3,11 +3,23 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
+import os
 import joblib
 from utils import extract_features
+from dataset_store import DatasetStore, is_store
+from monitoring import build_profile
+from ml_model import write_manifest
 
 def prepare_dataset(csv_path):
-    """Load and prepare dataset"""
+    """Load and prepare dataset from a CSV file or a dataset store directory"""
+    if is_store(csv_path):
+        store = DatasetStore(csv_path)
+        X, y = store.features(), store.labels()
+        print(f"Loaded {len(store)} precomputed samples from {csv_path}")
+        print(f"Positive samples (has smell): {sum(y)}")
+        print(f"Negative samples (clean code): {len(y) - sum(y)}")
+        return X, y
+    
     df = pd.read_csv(csv_path)
     
     # Extract features for each code sample
@@ -73,16 +85,23 @@ def train_model(X, y):
     print("\nTop 5 Important Features:")
     print(feature_importance.head())
     
-    # Save model and scaler
-    joblib.dump(rf_model, 'ml_model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
+    # Save model and scaler; write-then-rename so a running API that
+    # watches these files never loads a half-written artifact
+    for obj, path in [(build_profile(X_train), 'feature_profile.pkl'),
+                      (scaler, 'scaler.pkl'), (rf_model, 'ml_model.pkl')]:
+        joblib.dump(obj, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    # Last: the API only loads a model/scaler pair listed in the manifest
+    write_manifest(['ml_model.pkl', 'scaler.pkl'])
     print("\nModel saved as 'ml_model.pkl'")
     
     return rf_model, scaler
 
 if __name__ == "__main__":
-    # Load and prepare data
-    X, y = prepare_dataset('data/code_samples.csv')
+    import sys
+    
+    # Load and prepare data (CSV file or dataset store directory)
+    X, y = prepare_dataset(sys.argv[1] if len(sys.argv) > 1 else 'data/code_samples.csv')
     
     # Train model
     model, scaler = train_model(X, y)
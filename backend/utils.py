@@ -3,6 +3,13 @@ import re
 from radon.complexity import cc_visit
 from radon.metrics import mi_visit
 
+# Feature columns in the order produced by extract_features
+FEATURE_NAMES = [
+    'num_lines', 'num_functions', 'num_classes', 'num_loops', 'num_ifs',
+    'max_params', 'max_depth', 'complexity', 'maintainability',
+    'num_comments', 'avg_line_length'
+]
+
 def extract_features(code):
     """Extract numerical features from code for ML model"""
     try: